@@ -28,19 +28,21 @@ QGIS Plugin for DDR manipulation
 """
 
 import os
-import http.client
-import inspect
 import json
-import requests
 import shutil
+import stat
 import tempfile
 import time
 import unicodedata
-import zipfile
-from datetime import datetime
+from collections import Counter
 from dataclasses import dataclass
-from pathlib import Path
-from qgis.PyQt.QtCore import QCoreApplication
+from http.client import responses as HTTP_RESPONSES
+from osgeo import gdal, ogr
+try:
+    import orjson  # Faster JSON parser/serializer when available
+except ImportError:
+    orjson = None
+from qgis.PyQt.QtCore import QCoreApplication, QStandardPaths
 from qgis.PyQt.QtGui import QIcon
 from qgis.core import (Qgis, QgsProcessing, QgsProcessingAlgorithm, QgsProcessingParameterDistance,
                        QgsProcessingParameterFeatureSource, QgsProcessingParameterFeatureSink,
@@ -52,55 +54,80 @@ from qgis.core import (Qgis, QgsProcessing, QgsProcessingAlgorithm, QgsProcessin
                        QgsProviderRegistry, QgsProcessingParameterAuthConfig,  QgsApplication,  QgsAuthMethodConfig,
                        QgsProcessingParameterFile, QgsProcessingParameterDefinition)
 
+# Translation table replacing the coma "," by a semi column ";"
+COMMA_TO_SEMICOLON = str.maketrans(',', ';')
+DATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # Format of the date and time of the log messages
+
 
 class ResponseCodes(object):
     """This class manages response codes from the DDR API """
 
+    # Error messages by status code for each family of end points (other codes use the HTTP description)
+    LOGIN_ERRORS = {400: "Bad request received on server.",
+                    401: "Invalid credentials provided."}
+    READ_ERRORS = {401: "Access token is missing or invalid.",
+                   403: "Access does not have the required scope."}
+    SERVICE_ERRORS = {401: "Access token is missing or invalid.",
+                      403: "Access does not have the required scope.",
+                      500: "Internal error."}
+    VALIDATE_ERRORS = {401: "Access token is missing or invalid.",
+                       403: "Access token does not have the required scope.",
+                       500: "Internal error."}
+
     @staticmethod
     def _push_response(feedback, response, status_code, message):
         """This method displays messages in the log section of the processing tool"""
 
         try:
             Utils.push_info(feedback, "ERROR: ", f"{status_code} - {message}")
+            if not Utils.verbose:
+                # The full JSON response is only serialized and logged in debug mode
+                return
             try:
-                json_response = response.json()
-                results = json.dumps(json_response, indent=4, ensure_ascii=False)
+                json_response = Utils.json_loads(response.content)
+                results = Utils.json_dumps(json_response)
                 Utils.push_info(feedback, "ERROR: ", results, pad_with_dot=True)
             except Exception:
                 pass
         except Exception:
             raise UserMessageException(f'JSON response for status code {status_code} is missing or badly formed: {json_response}')
 
+    @staticmethod
+    def _dispatch(feedback, response, success_statuses, success_action, error_messages):
+        """This method calls the success action or displays the error message associated to the status code"""
+
+        status = response.status_code
+        if status in success_statuses:
+            try:
+                success_action(feedback, response)
+            except ValueError:
+                if status == 304:
+                    raise  # Corrupted cached content; handled by Utils.read_cached_end_point
+                raise UserMessageException(f"Invalid response from the DDR Publication API: {response.url}")
+        else:
+            message = error_messages.get(status) or HTTP_RESPONSES.get(status, "Unknown error")
+            ResponseCodes._push_response(feedback, response, status, message)
+
     @staticmethod
     def validate_project_file(feedback, response):
         """This method manages the response codes for the DDR Publisher API Post /validate
         This API validates if a project is compliant when a project is complain it can be published/unpublished"""
 
-        status = response.status_code
-        if status == 200:
-            json_response = response.json()
-            results = json.dumps(json_response, indent=4, ensure_ascii=False)
+        def _success(feedback, response):
+            json_response = Utils.json_loads(response.content)
+            results = Utils.json_dumps(json_response)
             Utils.push_info(feedback, "INFO: ", results, pad_with_dot=True)
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access token does not have the required scope.")
-        elif status == 500:
-            ResponseCodes._push_response(feedback, response, 500, "Internal error.")
-        else:
-            description = http.client.responses[status]
-            ResponseCodes._push_response(feedback, response, status, description)
+
+        ResponseCodes._dispatch(feedback, response, (200,), _success, ResponseCodes.VALIDATE_ERRORS)
 
     @staticmethod
     def create_access_token(feedback, response):
         """This method manages the response codes for the DDR Publisher API Post /login
         To log into the DDR API and get a valid token"""
 
-        status = response.status_code
-
-        if status == 200:
+        def _success(feedback, response):
             Utils.push_info(feedback, "INFO: A token or a refresh token is given to the user")
-            json_response = response.json()
+            json_response = Utils.json_loads(response.content)
             # Store the access token in a global variable for access by other entry points
             LOGIN_TOKEN.set_token(json_response["access_token"])
             expires_in = json_response["expires_in"]
@@ -112,114 +139,83 @@ class ResponseCodes(object):
             Utils.push_info(feedback, "INFO: ", f"Refresh token: {refresh_token[0:29]}...")
             Utils.push_info(feedback, "INFO: ", f"Refresh expire in: {refresh_expires_in}")
             Utils.push_info(feedback, "INFO: ", f"Token type: {token_type}")
-        elif status == 400:
-            ResponseCodes._push_response(feedback, response, 400, "Bad request received on server.")
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Invalid credentials provided.")
-        else:
-            description = http.client.responses[status]
-            ResponseCodes._push_response(feedback, response, status, description)
+
+        ResponseCodes._dispatch(feedback, response, (200,), _success, ResponseCodes.LOGIN_ERRORS)
 
     @staticmethod
-    def read_csz_theme(feedback, response):
-        """This method manages the response codes for the DDR Publisher API Get /csz_themes
-        This method extract the themes from the DDR"""
+    def _read_content(feedback, response, cached_content, msg):
+        """This method parses the JSON content of the response, or the cached content when the
+           response is 304 (Not Modified). A corrupted content raises a ValueError"""
 
-        status = response.status_code
+        Utils.push_info(feedback, f"INFO: Status code: {response.status_code}")
+        if response.status_code == 304:
+            Utils.push_info(feedback, f"INFO: {msg} (from the cache)")
+            return Utils.json_loads(cached_content)
 
-        if status == 200:
-            Utils.push_info(feedback, f"INFO: Status code: {status}")
-            msg = "Reading the available Clip Zip Ship Themes."
-            Utils.push_info(feedback, f"INFO: {msg}")
-            json_response = response.json()
+        Utils.push_info(feedback, f"INFO: {msg}")
+        return Utils.json_loads(response.content)
+
+    @staticmethod
+    def read_csz_theme(feedback, response, cached_content=None):
+        """This method manages the response codes for the DDR Publisher API Get /csz_themes
+        This method extract the themes from the DDR (or from the cached content when not modified)"""
+
+        def _success(feedback, response):
+            json_response = ResponseCodes._read_content(feedback, response, cached_content,
+                                                        "Reading the available Clip Zip Ship Themes.")
             DDR_INFO.add_themes(json_response)
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
-        else:
-            description = http.client.responses[status]
-            ResponseCodes._push_response(feedback, response, status, description)
+
+        success_statuses = (200,) if cached_content is None else (200, 304)
+        ResponseCodes._dispatch(feedback, response, success_statuses, _success, ResponseCodes.READ_ERRORS)
 
     @staticmethod
-    def read_ddr_departments(feedback, response):
+    def read_ddr_departments(feedback, response, cached_content=None):
         """This method manages the response codes for the DDR Publisher API Get /csz_departments
-           This method extract the departments from the DDR"""
-
-        status = response.status_code
+           This method extract the departments from the DDR (or from the cached content when not modified)"""
 
-        if status == 200:
-            Utils.push_info(feedback, f"INFO: Status code: {status}")
-            msg = "Reading the available DDR departments."
-            Utils.push_info(feedback, f"INFO: {msg}")
-            json_response = response.json()
+        def _success(feedback, response):
+            json_response = ResponseCodes._read_content(feedback, response, cached_content,
+                                                        "Reading the available DDR departments.")
             DDR_INFO.add_departments(json_response)
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
-        else:
-            description = http.client.responses[status]
-            ResponseCodes._push_response(feedback, response, status, description)
+
+        success_statuses = (200,) if cached_content is None else (200, 304)
+        ResponseCodes._dispatch(feedback, response, success_statuses, _success, ResponseCodes.READ_ERRORS)
 
     @staticmethod
     def read_user_email(feedback, response):
         """This method manages the response codes for the DDR Publisher API Get /ddr_my_email
            This method extract the email associated with user login"""
 
-        status = response.status_code
-
-        if status == 200:
-            Utils.push_info(feedback, f"INFO: Status code: {status}")
+        def _success(feedback, response):
+            Utils.push_info(feedback, f"INFO: Status code: {response.status_code}")
             msg = "Reading the user email."
             Utils.push_info(feedback, f"INFO: {msg}")
-            json_response = response.json()
+            json_response = Utils.json_loads(response.content)
             DDR_INFO.add_email(json_response)
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
-        else:
-            description = http.client.responses[status]
-            ResponseCodes._push_response(feedback, response, status, description)
+
+        ResponseCodes._dispatch(feedback, response, (200,), _success, ResponseCodes.READ_ERRORS)
 
     @staticmethod
     def publish_project_file(feedback, response):
         """This method manages the response codes for the DDR Publisher API PUT /services
         """
 
-        status = response.status_code
-
-        if status == 204:
+        def _success(feedback, response):
             msg = "Successfully published the project file(s) in QGIS Server."
             Utils.push_info(feedback, f"INFO: {msg}")
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
-        elif status == 500:
-            ResponseCodes._push_response(feedback, response, 500, "Internal error.")
-        else:
-            ResponseCodes._push_response(feedback, response, status, "Unknown error")
+
+        ResponseCodes._dispatch(feedback, response, (204,), _success, ResponseCodes.SERVICE_ERRORS)
 
     @staticmethod
     def unpublish_project_file(feedback, response):
         """This method manages the response codes for the DDR Unpublisher API DELETE /services
            """
 
-        status = response.status_code
-
-        if status == 204:
+        def _success(feedback, response):
             msg = "Successfully deleted the Service (data remains in the database)."
             Utils.push_info(feedback, f"INFO: {msg}")
-        elif status == 401:
-            ResponseCodes._push_response(feedback, response, 401, "Access token is missing or invalid.")
-        elif status == 403:
-            ResponseCodes._push_response(feedback, response, 403, "Access does not have the required scope.")
-        elif status == 500:
-            ResponseCodes._push_response(feedback, response, 500, "Internal error.")
-        else:
-            ResponseCodes._push_response(feedback, response, status, "Unknown error")
+
+        ResponseCodes._dispatch(feedback, response, (204,), _success, ResponseCodes.SERVICE_ERRORS)
 
 
 class LoginToken(object):
@@ -228,11 +224,14 @@ class LoginToken(object):
     def __init__(self):
 
         self.token = None
+        self.headers = None
 
     def set_token(self, token):
-        """This method sets the token """
+        """This method sets the token and the HTTP headers used by all the authenticated calls"""
 
         self.token = token
+        self.headers = {'accept': 'application/json',
+                        'Authorization': 'Bearer ' + token}
 
     def get_token(self, feedback):
         """This method allows to get the token. If the token is None than an error is rose because the login  was
@@ -245,6 +244,14 @@ class LoginToken(object):
 
         return self.token
 
+    def get_headers(self, feedback):
+        """This method returns the HTTP headers (with the token) shared by the authenticated calls.
+           An error is rose if the login was not done"""
+
+        self.get_token(feedback)  # Validate that the login was done
+
+        return self.headers
+
 
 class DdrInfo(object):
     """This class holds and manages different information extracted from the DDR using the API"""
@@ -255,9 +262,13 @@ class DdrInfo(object):
         self.qgis_layer_name_fr = None
         self.short_name_en = None
         self.short_name_fr = None
+        self.nbr_layers = 0
         self.json_theme = []
         self.json_department = []
         self.json_email = []
+        self.theme_uuid = {}          # Theme title (en and fr) => theme UUID
+        self.theme_lst = {"en": [], "fr": []}
+        self.department_lst = []
 
     def init_project_file(self):
 
@@ -265,14 +276,19 @@ class DdrInfo(object):
         self.qgis_layer_name_fr = []
         self.short_name_en = []
         self.short_name_fr = []
+        self.nbr_layers = 0
 
-    def add_layer(self, src_layer, language):
+    def add_layers(self, src_layers, language):
+        """Add the short names of the layers of a project file
+           Raise an exception if a short name is missing or duplicate"""
 
-        short_name = src_layer.shortName()
-
-        # validate that the short name is present
-        if short_name is None or short_name == "":
-            raise UserMessageException(f"The short name for layer {src_layer.name()} is missing")
+        short_names = []
+        for src_layer in src_layers:
+            short_name = src_layer.shortName()
+            # validate that the short name is present
+            if short_name is None or short_name == "":
+                raise UserMessageException(f"The short name for layer {src_layer.name()} is missing")
+            short_names.append(short_name)
 
         # Validate that the short name is not duplicate
         if language == "EN":
@@ -280,10 +296,12 @@ class DdrInfo(object):
         else:
             qgis_layer_name = self.qgis_layer_name_fr
 
-        if short_name not in qgis_layer_name:
-            qgis_layer_name.append(short_name)
-        else:
-            raise UserMessageException(f"Duplicate short name {short_name} for layer {src_layer.name()}")
+        qgis_layer_name.extend(short_names)
+        if len(qgis_layer_name) != len(set(qgis_layer_name)):
+            duplicates = [name for name, count in Counter(qgis_layer_name).items() if count > 1]
+            raise UserMessageException(f"Duplicate short name(s): {', '.join(duplicates)}")
+
+        self.nbr_layers = max(self.nbr_layers, len(qgis_layer_name))
 
     def get_layer_short_name(self, src_layer):
         """Get the short name from the layer"""
@@ -291,10 +309,9 @@ class DdrInfo(object):
         return src_layer.shortName()
 
     def get_nbr_layers(self):
+        """Get the maximum number of layers of the English and French project files"""
 
-        a = len(self.qgis_layer_name_en)
-        b = len(self.qgis_layer_name_fr)
-        return max(a, b)
+        return self.nbr_layers
 
 
     def add_email(self, json_email):
@@ -314,8 +331,7 @@ class DdrInfo(object):
         self.json_department = json_department
         # Verify the structure/content of the JSON document
         try:
-            for item in self.json_department:
-                acronym = item['qgis_data_store_root_subpath']
+            self.department_lst = [item['qgis_data_store_root_subpath'] for item in self.json_department]
         except KeyError:
             # Bad structure raise an exception and crash
             raise UserMessageException("Invalid structure of the JSON theme response from the DDR request")
@@ -323,71 +339,72 @@ class DdrInfo(object):
     def get_department_lst(self):
         """Extract the departments in the form of a list"""
 
-        department_lst = []
-        for item in self.json_department:
-            department = item['qgis_data_store_root_subpath']
-            department_lst.append(department)
-
-        return department_lst
+        return self.department_lst
 
     def add_themes(self, json_theme):
         """Add the the themes from the JSON response structure
            Verify the validity of the JSON structure"""
 
         self.json_theme = json_theme
+        theme_uuid = {}
+        theme_lst = {"en": [], "fr": []}
         # Verify the structure/content of the JSON document
         try:
             for item in self.json_theme:
-                theme_uuid = item['theme_uuid']
+                item_uuid = item['theme_uuid']
                 title = item['title']
                 # Replace the coma "," by a semi column ";" as QGIS processing enum does not like coma
-                title['en'] = title['en'].replace(',', ';')
-                title['fr'] = title['fr'].replace(',', ';')
+                for language in ("en", "fr"):
+                    title[language] = title[language].translate(COMMA_TO_SEMICOLON)
+                    theme_uuid[title[language]] = item_uuid
+                    theme_lst[language].append(title[language])
         except KeyError:
             # Bad structure raise an exception and crash
             raise UserMessageException("Invalid structure of the JSON theme response from the DDR request")
 
+        self.theme_uuid = theme_uuid
+        self.theme_lst = theme_lst
+
     def get_theme_lst(self, language):
         """Extract the themes in the form of a list"""
 
         if language not in ["fr", "en"]:
             raise UserMessageException("Internal error: Invalid language")
-        theme_lst = []
-        for item in self.json_theme:
-            title = item['title']
-            theme_lst.append(title[language])
 
-        return theme_lst
+        return self.theme_lst[language]
 
     def get_theme_uuid(self, title):
         """Get the theme UUID for a theme title
            Raise an exception if the theme cannot be find in the list (should not happen...)"""
 
         if title is None or title == "":
+            return ""
 
-            item_uuid = ""
-        else:
-            for item in self.json_theme:
-                item_uuid = item['theme_uuid']
-                item_title = item['title']
-                item_title_en = item_title['en']
-                item_title_fr = item_title['fr']
-                if title in (item_title_en, item_title_fr):
-                    break
-                else:
-                    item_uuid = None
-
-            if item_uuid is None:
-                # Nothing was found internal error
-                raise UserMessageException(f"Internal error: The 'title' is not found...")
-
-        return item_uuid
+        try:
+            return self.theme_uuid[title]
+        except KeyError:
+            # Nothing was found internal error
+            raise UserMessageException(f"Internal error: The 'title' is not found...")
 
 
 DDR_INFO = DdrInfo()
 
 LOGIN_TOKEN = LoginToken()
 
+# Single HTTP session shared by all the DDR API calls to reuse the TLS connections (keep-alive)
+# Created by Utils.get_http_session() at first use
+HTTP_SESSION = None
+# Base exception of requests, set with the session; no requests error can happen before the session exists
+HTTP_ERROR = ()
+HTTP_TIMEOUT = (10, 60)  # Connect and read timeout in seconds
+HTTP_UPLOAD_TIMEOUT = (10, None)  # No read timeout: the DDR processes the uploaded zip file before answering
+
+# GDAL options used while the GeoPackage is written; it is a scratch file that does not need the
+# SQLite durability (no fsync, journal in memory) and the spatial index bulk load needs a bigger cache (MB)
+GPKG_WRITE_OPTIONS = {"OGR_SQLITE_SYNCHRONOUS": "OFF",
+                      "OGR_SQLITE_JOURNAL": "MEMORY",
+                      "OGR_SQLITE_CACHE": "256"}
+
 @dataclass
 class ControlFile:
     """Declare the fields in the control control file"""
@@ -404,6 +421,7 @@ class ControlFile:
     control_file_dir: str = None         # Name of temporary directory
     control_file_name: str = None        # Name of the control file
     zip_file_name: str = None            # Name of the zip file
+    zip_file: object = None              # Opened zip file (in memory or on disk) used for the upload
     keep_files: str = None               # Name of the flag to keep the temporary files and directory
     json_document: str = None            # Name of the JSON document
     dst_qgs_project_name: str = None     # Name of the output QGIS project file
@@ -411,6 +429,9 @@ class ControlFile:
     qgis_project_file_fr: str = None     # Name of the input French QGIS project file
     out_qgs_project_file_en: str = None  # Name out the output English project file
     out_qgs_project_file_fr: str = None  # Name out the output English project file
+    qgs_project: QgsProject = None       # Scratch QGIS project used to process the project files
+    gpkg_layer_names: set = None         # Name of the layers copied in the GeoPackage
+    qgs_layers_en: tuple = None          # Layers of the English QGIS project file loaded in QGIS
 
 
 class UserMessageException(Exception):
@@ -420,9 +441,14 @@ class UserMessageException(Exception):
 class Utils:
     """Contains a list of static methods"""
 
+    verbose = False  # Debug mode: log the HTTP requests and the full JSON responses of the DDR API
+
     @staticmethod
     def process_algorithm(self, process_type, parameters, context, feedback):
 
+        # Reset the debug mode left by a previous run; it is set from the KEEP_FILES parameter of this run
+        Utils.verbose = False
+
         # Init the project files by resetting the layers structures
         DDR_INFO.init_project_file()
 
@@ -432,50 +458,54 @@ class Utils:
         # Extract the parameters
         self.read_parameters(ctl_file, parameters, context, feedback)
 
-        # Copy the QGIS project file (.qgs)
-        Utils.copy_qgis_project_file(ctl_file, feedback)
-
-        # Copy the selected layers in the GPKG file
-        Utils.copy_layer_gpkg(ctl_file, feedback)
-
-        # Set the layer data source
-        Utils.set_layer_data_source(ctl_file, feedback)
+        try:
+            # Copy the QGIS project file (.qgs)
+            Utils.copy_qgis_project_file(ctl_file, feedback)
+
+            # Copy the selected layers in the GPKG file and set their data source
+            Utils.copy_layer_gpkg(ctl_file, feedback)
+
+            # Write the project files with the new layer data source
+            Utils.set_layer_data_source(ctl_file, feedback)
+
+            # Creation of the JSON control file
+            Utils.create_json_control_file(ctl_file, feedback)
+
+            # Creation of the ZIP file
+            Utils.check_canceled(feedback)
+            Utils.create_zip_file(ctl_file, feedback)
+
+            # Validate the project file
+            if process_type == "VALIDATE":
+                DdrValidate.validate_project_file(ctl_file, parameters, context, feedback)
+            elif process_type == "PUBLISH":
+                # Publish the project file
+                DdrPublish.publish_project_file(ctl_file, parameters, context, feedback)
+            elif process_type == "UNPUBLISH":
+                # Unpublish the project file
+                DdrUnpublish.unpublish_project_file(ctl_file, parameters, context, feedback)
+            else:
+                raise UserMessageException(f"Internal error. Unknown Process Type: {process_type}")
 
-        # Creation of the JSON control file
-        Utils.create_json_control_file(ctl_file, feedback)
-
-        # Creation of the ZIP file
-        Utils.create_zip_file(ctl_file, feedback)
-
-        # Validate the project file
-        if process_type == "VALIDATE":
-            DdrValidate.validate_project_file(ctl_file, parameters, context, feedback)
-        elif process_type == "PUBLISH":
-            # Publish the project file
-            DdrPublish.publish_project_file(ctl_file, parameters, context, feedback)
-        elif process_type == "UNPUBLISH":
-            # Unpublish the project file
-            DdrUnpublish.unpublish_project_file(ctl_file, parameters, context, feedback)
-        else:
-            raise UserMessageException(f"Internal error. Unknown Process Type: {process_type}")
+        finally:
+            # Release the scratch project and delete the temporary directory even when the process fails
+            Utils.restore_original_project_file(ctl_file, feedback)
+            Utils.delete_dir_file(ctl_file, feedback)
 
-        # Restoring original .qgs project file
-        Utils.restore_original_project_file(ctl_file, feedback)
+        return
 
-        # Deleting the temporary directory and files
-        # import web_pdb; web_pdb.set_trace()
-        Utils.delete_dir_file(ctl_file, feedback)
+    @staticmethod
+    def check_canceled(feedback):
+        """Stop the process when the user has canceled it (the temporary files are still deleted)"""
 
-        return
+        if feedback.isCanceled():
+            raise UserMessageException("The process was canceled by the user")
 
     @staticmethod
     def get_date_time():
         """Extract the current date and time """
 
-        now = datetime.now()  # current date and time
-        date_time = now.strftime("%Y-%m-%d %H:%M:%S")
-
-        return date_time
+        return time.strftime(DATE_TIME_FORMAT)
 
     @staticmethod
     def create_json_control_file(ctl_file, feedback):
@@ -497,58 +527,89 @@ class Utils:
             },
             "service_parameters": [
                 {
-                    "in_project_filename": Path(ctl_file.out_qgs_project_file_en).name,
+                    "in_project_filename": os.path.basename(ctl_file.out_qgs_project_file_en),
                     "language": 'English',
                     "service_schema_name": ctl_file.department
                 },
                 {
-                    "in_project_filename": Path(ctl_file.out_qgs_project_file_fr).name,
+                    "in_project_filename": os.path.basename(ctl_file.out_qgs_project_file_fr),
                     "language": 'French',
                     "service_schema_name": ctl_file.department
                 }
             ]
         }
 
-        # Serialize the JSON
-        json_object = json.dumps(json_control_file, indent=4, ensure_ascii=False)
-
-        # Write the JSON document
-        ctl_file.control_file_name = os.path.join(ctl_file.control_file_dir, "ControlFile.json")
-        with open(ctl_file.control_file_name, "w") as outfile:
-            outfile.write(json_object)
+        # Serialize and write the JSON document
+        Utils.json_write(json_control_file, ctl_file.control_file_name)
 
         Utils.push_info(feedback, f"INFO: Creation of the JSON control file: {ctl_file.control_file_name}")
 
         return
 
+    @staticmethod
+    def get_http_session():
+        """Get the HTTP session shared by all the DDR API calls
+           requests is imported and the session created at first use to speed up the loading of the plugin"""
+
+        global HTTP_SESSION, HTTP_ERROR
+
+        if HTTP_SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            HTTP_ERROR = requests.exceptions.RequestException
+            HTTP_SESSION = requests.Session()
+            HTTP_SESSION.verify = False
+            HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                                       max_retries=Retry(total=3, backoff_factor=0.2,
+                                                                         status_forcelist=(429, 500, 502, 503, 504),
+                                                                         allowed_methods=frozenset(['GET']),
+                                                                         raise_on_status=False)))
+
+        return HTTP_SESSION
+
     @staticmethod
     def read_csz_themes(ctl_file, feedback):
         """Read the CSZ themes from end service end point"""
 
         url = "https://qgis.ddr-stage.services.geo.ca/api/czs_themes"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
-        try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_csz_theme(feedback, response)
-
-        except requests.exceptions.RequestException as e:
-            raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
+        Utils.read_cached_end_point(url, "csz_themes", ResponseCodes.read_csz_theme, feedback)
 
     @staticmethod
     def read_ddr_departments(ctl_file, feedback):
         """Read the DDR departments from end service end point"""
 
         url = "https://qgis.ddr-stage.services.geo.ca/api/ddr_departments"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
+        Utils.read_cached_end_point(url, "ddr_departments", ResponseCodes.read_ddr_departments, feedback)
+
+    @staticmethod
+    def read_cached_end_point(url, cache_name, response_codes, feedback):
+        """Read an end point with If-None-Match; the cached content is used when it is not modified (304)"""
+
+        headers = LOGIN_TOKEN.get_headers(feedback)
+        etag, cached_content = Utils.read_cache(cache_name)
         try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
-            ResponseCodes.read_ddr_departments(feedback, response)
+            Utils.push_info(feedback, f"INFO: HTTP Get Request: {url}")
+            if etag is not None:
+                response = Utils.get_http_session().get(url, headers={**headers, 'If-None-Match': etag},
+                                                        timeout=HTTP_TIMEOUT)
+                if response.status_code == 304:
+                    try:
+                        response_codes(feedback, response, cached_content)
+                        return
+                    except ValueError:
+                        # Truncated or corrupted cache; delete it and read the end point again
+                        Utils.push_info(feedback, f"WARNING: Invalid cache: {cache_name} ==> Reading the DDR again")
+                        Utils.delete_cache(cache_name)
+                        response = Utils.get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
+            else:
+                response = Utils.get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
 
-        except requests.exceptions.RequestException as e:
+            response_codes(feedback, response)
+            Utils.write_cache(cache_name, response)
+
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
 
     @staticmethod
@@ -556,14 +617,13 @@ class Utils:
         """Read the user email from the end service end point"""
 
         url = "https://qgis.ddr-stage.services.geo.ca/api/ddr_my_email"
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
+        headers = LOGIN_TOKEN.get_headers(feedback)
         try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.get(url, verify=False, headers=headers)
+            Utils.push_info(feedback, f"INFO: HTTP Get Request: {url}")
+            response = Utils.get_http_session().get(url, headers=headers, timeout=HTTP_TIMEOUT)
             ResponseCodes.read_user_email(feedback, response)
 
-        except requests.exceptions.RequestException as e:
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
 
     @staticmethod
@@ -576,191 +636,460 @@ class Utils:
                    "charset":"utf-8" }
 
         Utils.push_info(feedback, "INFO: Authentication to DDR")
-        Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-        Utils.push_info(feedback, f"INFO: HTTP Headers: {headers}")
+        Utils.push_info(feedback, f"INFO: HTTP Headers: {headers}")  # No access token in the login headers
         json_doc = { "password": password,
                      "username": username}
 
         try:
-            Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-            response = requests.post(url, verify=False, headers=headers, json=json_doc)
+            Utils.push_info(feedback, f"INFO: HTTP Post Request: {url}")
+            response = Utils.get_http_session().post(url, headers=headers, json=json_doc, timeout=HTTP_TIMEOUT)
 
             ResponseCodes.create_access_token(feedback, response)
 
-        except requests.exceptions.RequestException as e:
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
         return
 
+    @staticmethod
+    def set_file_names(ctl_file):
+        """Set, once, the name of all the files created in the temporary directory"""
+
+        control_file_dir = ctl_file.control_file_dir
+        ctl_file.control_file_name = os.path.join(control_file_dir, "ControlFile.json")
+        ctl_file.gpkg_file_name = os.path.join(control_file_dir, "qgis_vector_layers.gpkg")
+        ctl_file.zip_file_name = os.path.join(control_file_dir, "ddr_publish.zip")
+        ctl_file.out_qgs_project_file_en = os.path.join(control_file_dir, os.path.basename(ctl_file.qgis_project_file_en))
+        ctl_file.out_qgs_project_file_fr = os.path.join(control_file_dir, os.path.basename(ctl_file.qgis_project_file_fr))
+
     @staticmethod
     def copy_qgis_project_file(ctl_file, feedback):
         """Creates a copy of the QGIS project file"""
 
-        qgs_project = QgsProject.instance()
-
         # Validate that the present QGIS project is saved before the processing
-        if qgs_project.isDirty():
+        if QgsProject.instance().isDirty():
             raise UserMessageException("The QGIS project file must be saved before starting the DDR publication")
 
-        # Save the name of the actual QGS project file
-        ctl_file.src_qgs_project_name = qgs_project.fileName()
-
-        # Create temporary directory
-        ctl_file.control_file_dir = tempfile.mkdtemp(prefix='qgis_')
-        Utils.push_info(feedback, "INFO: Temporary directory created: ", ctl_file.control_file_dir)
-
-        # Clear or Close  the actual QGS project
-        qgs_project.clear()
+        # The project files are processed in a scratch project; the project opened in QGIS is left untouched
+        qgs_project = QgsProject()
+        ctl_file.qgs_project = qgs_project
 
         # Read the French QGIS project
-        qgs_project.read(ctl_file.qgis_project_file_fr)
-        qgis_file_fr = Path(ctl_file.qgis_project_file_fr).name
-        ctl_file.out_qgs_project_file_fr = os.path.join(ctl_file.control_file_dir, qgis_file_fr)
-        qgs_project.write(ctl_file.out_qgs_project_file_fr)
-        Utils.push_info(feedback, "INFO: QGIS project file save as: ", ctl_file.out_qgs_project_file_fr)
-
-        qgs_project = QgsProject.instance()
-        for src_layer in qgs_project.mapLayers().values():
-            DDR_INFO.add_layer(src_layer, "FR")
+        # Only the short names of the French layers are needed; do not load their data providers
+        qgs_project.read(ctl_file.qgis_project_file_fr, QgsProject.FlagDontResolveLayers)
+        DDR_INFO.add_layers(qgs_project.mapLayers().values(), "FR")
 
         # Read the English QGIS project
         qgs_project.read(ctl_file.qgis_project_file_en)
-        qgis_file_en = Path(ctl_file.qgis_project_file_en).name
-        ctl_file.out_qgs_project_file_en = os.path.join(ctl_file.control_file_dir, qgis_file_en)
-        qgs_project.write(ctl_file.out_qgs_project_file_en)
-        Utils.push_info(feedback, "INFO: QGIS project file save as: ",ctl_file.out_qgs_project_file_en)
 
-        qgs_project = QgsProject.instance()
-        for src_layer in qgs_project.mapLayers().values():
-            DDR_INFO.add_layer(src_layer, "EN")
+        # Keep the layers of the English project; they are reused until another project is read
+        ctl_file.qgs_layers_en = tuple(qgs_project.mapLayers().values())
+        DDR_INFO.add_layers(ctl_file.qgs_layers_en, "EN")
 
-    @staticmethod
-    def copy_layer_gpkg(ctl_file, feedback):
-        """Copy the selected layers in the GeoPackage file"""
+        # Validate that there is something to publish before creating any file
+        if not any(src_layer.type() == QgsMapLayer.VectorLayer and src_layer.isSpatial()
+                   for src_layer in ctl_file.qgs_layers_en):
+            raise UserMessageException("The QGIS project file does not contain any spatial vector layer to publish")
 
-        ctl_file.gpkg_file_name = os.path.join(ctl_file.control_file_dir, "qgis_vector_layers.gpkg")
-        qgs_project = QgsProject.instance()
+        # Create temporary directory
+        ctl_file.control_file_dir = tempfile.mkdtemp(prefix='qgis_')
+        Utils.push_info(feedback, "INFO: Temporary directory created: ", ctl_file.control_file_dir)
+        Utils.set_file_names(ctl_file)
 
-        total = DDR_INFO.get_nbr_layers()  # Total number of layers to process
+    @staticmethod
+    def copy_layer_gpkg(ctl_file, feedback):
+        """Copy the selected layers in the GeoPackage file and set their data source to the GeoPackage"""
+
+        qgs_project = ctl_file.qgs_project
+
+        # Split the layers once: only the spatial vector layers are copied
+        src_layers = ctl_file.qgs_layers_en
+        vector_layers = [src_layer for src_layer in src_layers
+                         if src_layer.type() == QgsMapLayer.VectorLayer and src_layer.isSpatial()]
+        for src_layer in src_layers:
+            if src_layer.type() != QgsMapLayer.VectorLayer:
+                Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not vector ==> Not transferred")
+            elif not src_layer.isSpatial():
+                Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not spatial ==> Not transferred")
+
+        total = len(vector_layers)  # Total number of layers to copy
+        transform_context = qgs_project.transformContext()
+        provider_options = QgsDataProvider.ProviderOptions()
+        provider_options.transformContext = transform_context
         # Loop over each selected layers
-        for i, src_layer in enumerate(qgs_project.mapLayers().values()):
-            transform_context = QgsProject.instance().transformContext()
-            if src_layer.isSpatial():
-                if src_layer.type() == QgsMapLayer.VectorLayer:
-                    # Only copy vector layer
+        ctl_file.gpkg_layer_names = set()
+        gdal_options = Utils.set_gdal_options(GPKG_WRITE_OPTIONS)
+        try:
+            for i, src_layer in enumerate(vector_layers):
+                Utils.check_canceled(feedback)
+                feedback.setProgress(100 * i / total)  # One progress update per layer, not per feature
+                gpkg_layer_name = DDR_INFO.get_layer_short_name(src_layer)
+                ctl_file.gpkg_layer_names.add(gpkg_layer_name)
+                Utils.push_info(feedback, f"INFO: Copying layer: {src_layer.name()} ({i+1}/{total})")
+
+                # The first layer creates the GeoPackage file in the new temporary directory
+                if not Utils.translate_ogr_layer(ctl_file, src_layer, gpkg_layer_name, i > 0, feedback):
+                    # The layer cannot be copied directly by OGR; copy it feature by feature with QGIS
                     options = QgsVectorFileWriter.SaveVectorOptions()
-                    options.layerName = DDR_INFO.get_layer_short_name(src_layer)
-                    options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer if Path(
-                        ctl_file.gpkg_file_name).exists() else QgsVectorFileWriter.CreateOrOverwriteFile
+                    options.layerName = gpkg_layer_name
+                    options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer if i > 0 \
+                        else QgsVectorFileWriter.CreateOrOverwriteFile
+                    options.layerOptions = ["SPATIAL_INDEX=NO"]  # Spatial indexes are built after the copy
                     options.feedback = None
-                    Utils.push_info(feedback, f"INFO: Copying layer: {src_layer.name()} ({str(i+1)}/{str(total)})")
 
-                    error, err1, err2, err3 = QgsVectorFileWriter.writeAsVectorFormatV3(layer=src_layer,
+                    error, error_message, dummy, dummy = QgsVectorFileWriter.writeAsVectorFormatV3(layer=src_layer,
                                               fileName=ctl_file.gpkg_file_name,
                                               transformContext=transform_context,
                                               options=options)
+                    if error != QgsVectorFileWriter.NoError:
+                        # Stop the process; there is no point in publishing a partial GeoPackage
+                        raise UserMessageException(f"Unable to copy layer: {src_layer.name()} in the GeoPackage: "
+                                                   f"{error_message}")
 
-                else:
-                    Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not vector ==> Not transferred")
-            else:
-                Utils.push_info(feedback, f"WARNING: Layer: {src_layer.name()} is not spatial ==> transferred")
+                # Use the newly created GPKG layer as the data source of the layer
+                Utils.set_gpkg_data_source(ctl_file, src_layer, gpkg_layer_name, provider_options)
+
+            if vector_layers:
+                Utils.create_spatial_index(ctl_file, feedback)
+        finally:
+            Utils.set_gdal_options(gdal_options)  # Restore the original GDAL options
 
     @staticmethod
-    def set_layer_data_source(ctl_file, feedback):
+    def set_gdal_options(options):
+        """Set the GDAL configuration options and return their previous values"""
+
+        previous_options = {key: gdal.GetConfigOption(key) for key in options}
+        for key, value in options.items():
+            gdal.SetConfigOption(key, value)
+
+        return previous_options
+
+    @staticmethod
+    def translate_ogr_layer(ctl_file, src_layer, gpkg_layer_name, update, feedback):
+        """Copy an OGR layer in the GeoPackage with GDAL VectorTranslate (bulk copy by OGR)
+           Return False when the layer is not a plain OGR layer or the bulk copy fails and
+           the layer must be copied by QGIS"""
+
+        if src_layer.providerType() != "ogr" or src_layer.subsetString() != "" or \
+                src_layer.crs() != src_layer.dataProvider().crs():
+            # Filtered layers and layers with a CRS overridden in the project are copied by QGIS
+            return False
+
+        uri_parts = QgsProviderRegistry.instance().decodeUri("ogr", src_layer.source())
+        if uri_parts.get("subset") or uri_parts.get("openOptions") or uri_parts.get("vsiPrefix") or \
+                src_layer.dataProvider().encoding().upper() not in ("UTF-8", "UTF8"):
+            # Only the path and the layer name are given to VectorTranslate; the layers using other
+            # provider settings are copied by QGIS to get exactly what QGIS shows
+            return False
+
+        src_path = uri_parts.get("path", "")
+        if uri_parts.get("layerName"):
+            src_layers = [uri_parts["layerName"]]
+        elif src_path.lower().endswith(".shp") and "layerId" not in uri_parts:
+            src_layers = None  # Single layer data source
+        else:
+            return False
+
+        # QGIS exposes some sources as multi part (ex.: Shapefile polygons) while OGR declares them single
+        # part; the GeoPackage table must have the geometry type of the QGIS layer
+        geometry_type = "PROMOTE_TO_MULTI" if QgsWkbTypes.isMultiType(src_layer.wkbType()) else None
+        translate_options = gdal.VectorTranslateOptions(format="GPKG",
+                                                        accessMode="update" if update else None,
+                                                        layers=src_layers,
+                                                        layerName=gpkg_layer_name,
+                                                        geometryType=geometry_type,
+                                                        layerCreationOptions=["SPATIAL_INDEX=NO"])
+        try:
+            dst_data_source = gdal.VectorTranslate(ctl_file.gpkg_file_name, src_path, options=translate_options)
+        except RuntimeError:
+            dst_data_source = None  # Raised instead of returning None when gdal.UseExceptions() is active
+        if dst_data_source is None:
+            # The layer (or what was partly written) is overwritten by the copy done by QGIS
+            Utils.push_info(feedback, f"WARNING: Bulk copy failed for layer: {src_layer.name()}: "
+                                      f"{gdal.GetLastErrorMsg()} ==> Copied by QGIS")
+            return False
+        dst_data_source = None  # Close the GeoPackage
+
+        return True
+
+    @staticmethod
+    def create_spatial_index(ctl_file, feedback):
+        """Create the spatial index of all the layers of the GeoPackage in one transaction"""
+
+        Utils.push_info(feedback, f"INFO: Creating the spatial indexes in: {ctl_file.gpkg_file_name}")
+        data_source = ogr.Open(ctl_file.gpkg_file_name, update=1)
+        if data_source is None:
+            raise UserMessageException(f"Unable to open the GeoPackage: {ctl_file.gpkg_file_name}")
+
+        data_source.StartTransaction()
+        for i in range(data_source.GetLayerCount()):
+            ogr_layer = data_source.GetLayerByIndex(i)
+            geom_column = ogr_layer.GetGeometryColumn()
+            if geom_column:
+                # Quote the names as SQL literals (a short name may contain a quote)
+                layer_name = ogr_layer.GetName().replace("'", "''")
+                geom_column = geom_column.replace("'", "''")
+                result_set = data_source.ExecuteSQL(f"SELECT CreateSpatialIndex('{layer_name}', '{geom_column}')")
+                if result_set is not None:
+                    data_source.ReleaseResultSet(result_set)
+        data_source.CommitTransaction()
+        data_source = None  # Close the GeoPackage
+
+    @staticmethod
+    def set_gpkg_data_source(ctl_file, src_layer, gpkg_layer_name, provider_options):
+        """Set the data source of a layer to its copy (gpkg_layer_name) in the GeoPackage file"""
 
-        def _set_layer():
+        uri = QgsProviderRegistry.instance().encodeUri('ogr',
+                                                       {'path': ctl_file.gpkg_file_name,
+                                                        'layerName': gpkg_layer_name})
+        src_layer.setDataSource(uri, src_layer.name(), "ogr", provider_options)
 
-            qgs_project = QgsProject.instance()
+    @staticmethod
+    def set_layer_data_source(ctl_file, feedback):
+        """Write the English project file and set the data source of the French project file layers
+           (the data source of the English layers is set while they are copied in the GeoPackage)
+           The project files are written only once, after their data sources are set"""
+
+        qgs_project = ctl_file.qgs_project
+        qgs_project.write(ctl_file.out_qgs_project_file_en)
+        Utils.push_info(feedback, "INFO: QGIS project file save as: ", ctl_file.out_qgs_project_file_en)
+        qgs_project.clear()
+        ctl_file.qgs_layers_en = None  # The layers are deleted by the clear()
+        if ctl_file.qgis_project_file_fr  != "":
+            # The original data providers are replaced by the GPKG file; do not load them
+            qgs_project.read(ctl_file.qgis_project_file_fr, QgsProject.FlagDontResolveLayers)
             # Use the newly created GPKG file to set the data source of the QGIS project file
             provider_options = QgsDataProvider.ProviderOptions()
             provider_options.transformContext = qgs_project.transformContext()
-            # Loop over each layer
-            for i, src_layer in enumerate(qgs_project.mapLayers().values()):
+            for src_layer in qgs_project.mapLayers().values():
+                # Only the layers copied in the GeoPackage are processed (the unresolved layers
+                # do not know yet if they are spatial)
                 if src_layer.type() == QgsMapLayer.VectorLayer:
-                    # Only process vector layer
-                    if src_layer.type() == QgsMapLayer.VectorLayer:
-
-                        qgs_layer_name = src_layer.name()
-                        gpkg_layer_name = DDR_INFO.get_layer_short_name(src_layer)
-                        uri = QgsProviderRegistry.instance().encodeUri('ogr',
-                                                                       {'path': ctl_file.gpkg_file_name,
-                                                                        'layerName': gpkg_layer_name})
-                        src_layer.setDataSource(uri, qgs_layer_name, "ogr", provider_options)
-
-        qgs_project = QgsProject.instance()
-        _set_layer()
-        qgs_project.write(ctl_file.out_qgs_project_file_en)
-        qgs_project.clear()
-        if ctl_file.qgis_project_file_fr  != "":
-            qgs_project.read(ctl_file.out_qgs_project_file_fr)
-            _set_layer()
+                    gpkg_layer_name = DDR_INFO.get_layer_short_name(src_layer)
+                    if gpkg_layer_name in ctl_file.gpkg_layer_names:
+                        Utils.set_gpkg_data_source(ctl_file, src_layer, gpkg_layer_name, provider_options)
+                    else:
+                        Utils.push_info(feedback, f"WARNING: French layer: {src_layer.name()} has no English layer "
+                                                  f"with the short name: {gpkg_layer_name} ==> Data source not changed")
             qgs_project.write(ctl_file.out_qgs_project_file_fr)
-
+            Utils.push_info(feedback, "INFO: QGIS project file save as: ", ctl_file.out_qgs_project_file_fr)
 
     @staticmethod
     def create_zip_file(ctl_file, feedback):
         """Create the zip file in the working directory"""
 
-        # Change working directory to the temporary directory
-        current_dir = os.getcwd()  # Save current directory
-        os.chdir(ctl_file.control_file_dir)
+        import zipfile  # Imported at first use to speed up the loading of the plugin
 
-        # Create the zip file with the 4 files
-        lst_file_to_zip = [Path(ctl_file.control_file_name).name,
-                           Path(ctl_file.gpkg_file_name).name,
-                           Path(ctl_file.out_qgs_project_file_en).name,
-                           Path(ctl_file.out_qgs_project_file_fr).name]
-        ctl_file.zip_file_name = os.path.join(ctl_file.control_file_dir, "ddr_publish.zip")
-        Utils.push_info(feedback, f"INFO: Creating the zip file: {ctl_file.zip_file_name}")
-        with zipfile.ZipFile(ctl_file.zip_file_name, mode="w") as archive:
-            for file_to_zip in lst_file_to_zip:
-                archive.write(file_to_zip)
+        # Create the zip file with the 4 files; the DDR rejects a publication with a missing file
+        lst_file_to_zip = []
+        for file_name in (ctl_file.control_file_name, ctl_file.gpkg_file_name,
+                          ctl_file.out_qgs_project_file_en, ctl_file.out_qgs_project_file_fr):
+            if not file_name or not os.path.isfile(file_name):
+                raise UserMessageException(f"Unable to create the zip file; the file does not exist: {file_name}")
+            lst_file_to_zip.append((file_name, os.path.basename(file_name)))
 
-        # Reset to the current directory
-        os.chdir(current_dir)
+        if ctl_file.keep_files == "No":
+            # The zip file is not kept; build it in memory (spilled on disk over 64MB) and upload it from there
+            Utils.push_info(feedback, "INFO: Creating the zip file in memory")
+            ctl_file.zip_file = tempfile.SpooledTemporaryFile(max_size=64*1024*1024, suffix=".zip")
+            zip_output = ctl_file.zip_file
+        else:
+            Utils.push_info(feedback, f"INFO: Creating the zip file: {ctl_file.zip_file_name}")
+            zip_output = ctl_file.zip_file_name
+        with zipfile.ZipFile(zip_output, mode="w") as archive:
+            for file_name, arc_name in lst_file_to_zip:
+                if arc_name.endswith(".gpkg"):
+                    # The GeoPackage is stored without compression and streamed in the archive by chunk of 1MB
+                    zip_info = zipfile.ZipInfo.from_file(file_name, arc_name)
+                    with open(file_name, "rb") as src_file, archive.open(zip_info, "w") as dst_file:
+                        shutil.copyfileobj(src_file, dst_file, 1024*1024)
+                else:
+                    # The XML/JSON files are small and compress well with the fastest DEFLATE level
+                    archive.write(file_name, arc_name, compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
 
     @staticmethod
-    def restore_original_project_file(ctl_file, feedback):
-        """Restore the original project file"""
+    def get_zip_file_upload(ctl_file):
+        """Get the zip file (name, file object, content type) to upload to the DDR API"""
+
+        if ctl_file.zip_file is None:
+            ctl_file.zip_file = open(ctl_file.zip_file_name, "rb")
+        ctl_file.zip_file.seek(0)
+
+        return os.path.basename(ctl_file.zip_file_name), ctl_file.zip_file, "application/zip"
 
-        qgs_project = QgsProject.instance()
+    @staticmethod
+    def restore_original_project_file(ctl_file, feedback):
+        """Release the scratch project; the project opened in QGIS was never modified"""
 
-        # Reopen the original project file
-        Utils.push_info(feedback, f"INFO: Restoring original project file (.qgs): {ctl_file.src_qgs_project_name}")
-        qgs_project.read(ctl_file.src_qgs_project_name)
+        if ctl_file.qgs_project is not None:
+            # Close the layers so the files in the temporary directory are no longer in use
+            ctl_file.qgs_project.clear()
+            ctl_file.qgs_project = None
 
     @staticmethod
     def delete_dir_file(ctl_file, feedback):
         """Delete the temporary directory and files"""
 
-        if ctl_file.keep_files == "No":
+        if ctl_file.zip_file is not None:
+            # Close the zip file before deleting the directory (the file is locked on Windows)
+            ctl_file.zip_file.close()
+            ctl_file.zip_file = None
+
+        if ctl_file.keep_files == "No" and ctl_file.control_file_dir is not None:
+            def _remove_read_only(function, path, dummy):
+                # Windows refuses to delete read-only files; make the file writable and retry once
+                os.chmod(path, stat.S_IWRITE)
+                function(path)
+
             # Delete the temporary directory and all its content
-            for dummy in range(5):
+            for delay in (0.05, 0.1, 0.2, 0.4, 0.8, None):
                 # Sometimes the delete does work the first time so we have to retry the file being busy...
                 try:
-                    shutil.rmtree(ctl_file.control_file_dir)
+                    shutil.rmtree(ctl_file.control_file_dir, onerror=_remove_read_only)
                     Utils.push_info(feedback, f"INFO: Deleting temporary directory and content: {ctl_file.control_file_dir}")
                     break
-                except Exception:
-                    # Wait a little bit... to resolve synchronicity problem
-                    time.sleep(.5)
+                except OSError:
+                    if delay is None:
+                        Utils.push_info(feedback, f"WARNING: Unable to delete the temporary directory: "
+                                                  f"{ctl_file.control_file_dir}")
+                    else:
+                        # Wait a little bit longer each time... to resolve synchronicity problem
+                        time.sleep(delay)
+
+    @staticmethod
+    def get_cache_file_names(cache_name):
+        """Get the names of the content and ETag files of a cached DDR response"""
+
+        cache_dir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "pub_ddr_processing")
+        file_name = os.path.join(cache_dir, cache_name)
+
+        return f"{file_name}.json", f"{file_name}.etag"
+
+    @staticmethod
+    def read_cache(cache_name):
+        """Read a cached DDR response and its ETag; return (None, None) when there is no valid cache"""
+
+        content_file_name, etag_file_name = Utils.get_cache_file_names(cache_name)
+        try:
+            with open(etag_file_name, "r", encoding="utf-8") as etag_file:
+                etag = etag_file.read()
+            with open(content_file_name, "rb") as content_file:
+                content = content_file.read()
+        except OSError:
+            return None, None
+
+        return etag, content
+
+    @staticmethod
+    def write_cache(cache_name, response):
+        """Cache the content and ETag of a successful DDR response"""
+
+        etag = response.headers.get('ETag')
+        if response.status_code != 200 or etag is None:
+            return
+
+        content_file_name, etag_file_name = Utils.get_cache_file_names(cache_name)
+        try:
+            os.makedirs(os.path.dirname(content_file_name), exist_ok=True)
+            # Remove the ETag first and write it last; an interrupted write leaves no ETag next to a
+            # partial content. Each file is written in a temporary file then renamed (atomic replace)
+            if os.path.exists(etag_file_name):
+                os.remove(etag_file_name)
+            Utils.replace_file(content_file_name, response.content)
+            Utils.replace_file(etag_file_name, etag.encode("utf-8"))
+        except OSError:
+            # The cache is only an optimization; the next login will read the end point again
+            pass
+
+    @staticmethod
+    def replace_file(file_name, content):
+        """Write the content (bytes) in a temporary file and rename it to file_name (atomic replace)"""
+
+        tmp_file_name = f"{file_name}.tmp"
+        with open(tmp_file_name, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_file_name, file_name)
+
+    @staticmethod
+    def delete_cache(cache_name):
+        """Delete a cached DDR response and its ETag"""
+
+        for file_name in Utils.get_cache_file_names(cache_name):
+            try:
+                os.remove(file_name)
+            except OSError:
+                pass
+
+    @staticmethod
+    def json_loads(content):
+        """Parse a JSON document (bytes or str) using orjson when available"""
+
+        if orjson is not None:
+            return orjson.loads(content)
+
+        return json.loads(content)
+
+    @staticmethod
+    def json_dumps(json_object):
+        """Serialize and indent a JSON document using orjson when available"""
+
+        if orjson is not None:
+            return orjson.dumps(json_object, option=orjson.OPT_INDENT_2).decode('utf-8')
+
+        return json.dumps(json_object, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def json_write(json_object, file_name):
+        """Serialize and write a JSON document in a UTF-8 file without an intermediate string"""
+
+        if orjson is not None:
+            with open(file_name, "wb") as outfile:
+                outfile.write(orjson.dumps(json_object, option=orjson.OPT_INDENT_2))
+        else:
+            with open(file_name, "w", encoding="utf-8") as outfile:
+                json.dump(json_object, outfile, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def push_headers(feedback, headers):
+        """This method logs the HTTP headers only in debug mode without the access token"""
+
+        if Utils.verbose:
+            if 'Authorization' in headers:
+                headers = {**headers, 'Authorization': 'Bearer <redacted>'}
+            Utils.push_info(feedback, "INFO: HTTP Headers: ", headers)
+
+    @staticmethod
+    def push_zip_file(ctl_file, feedback):
+        """This method logs the zip file to upload; it is not written on disk when the files are not kept"""
+
+        if ctl_file.keep_files == "No":
+            Utils.push_info(feedback, "INFO: Zip file to publish: built in memory (temporary files not kept)")
+        else:
+            Utils.push_info(feedback, f"INFO: Zip file to publish: {ctl_file.zip_file_name}")
 
     @staticmethod
     def push_info(feedback, message, suppl="", pad_with_dot=False):
         """This method formats and logs the message in the processing toolbox log"""
 
-        str_date_time = Utils.get_date_time()
+        prefix = f"{Utils.get_date_time()} - {message}"  # Same date and time for all the lines
         suppl = str(suppl)  # Make sure the "text" to display is a string
         lines = suppl.split("\n")  # If the message is on many lines print many lines
         for line in lines:
             if pad_with_dot:
                 leading_sp = len(line) - len(line.lstrip())  # Extract the number of leading spaces
-                line = line.replace(line[0:leading_sp], "." * leading_sp)  # Replace leading spaces by "." (dots)
-            feedback.pushInfo(f"{str_date_time} - {str(message)}{line}")
+                line = "." * leading_sp + line[leading_sp:]  # Replace leading spaces by "." (dots)
+            feedback.pushInfo(prefix + line)
 
 
 class UtilsGui():
     """Contains a list of static methods"""
 
+    ICON = None  # Logo of the algorithms (loaded at first use)
+
+    # Options of the enum parameters (shared by all the algorithm instances)
+    LST_DOWNLOAD_INFO_ID = ["DDR_DOWNLOAD1"]
+    LST_QGS_SERVER_ID = ['DDR_QGS1']
+    LST_FLAG = ['Yes', 'No']
+
     HELP_USAGE = """
         <b>Usage</b>
         <u>Select the English QGIS project file (.qgs)</u>: Select the project file with the ENGLISH layer description.
@@ -772,9 +1101,18 @@ class UtilsGui():
         <u>Enter your email address</u>: Email address used to send publication notification.
         <u>Select the download info ID</u>: Download ID info (no choice).
         <u>Select the QGIS server</u>: Name of the QGIS server used for the publication (no choice).
-        <u>Keep temporary files (for debug purpose)</u> : Flag (Yes/No) for keeping/deleting temporary files.
+        <u>Keep temporary files (for debug purpose)</u> : Flag (Yes/No) for keeping/deleting temporary files and logging the full DDR responses.
     """
 
+    @staticmethod
+    def get_icon():
+        """Get the logo of the algorithms; the QIcon is created once and shared by all the algorithms"""
+
+        if UtilsGui.ICON is None:
+            UtilsGui.ICON = QIcon(os.path.join(os.path.dirname(__file__), 'logo.png'))
+
+        return UtilsGui.ICON
+
     @staticmethod
     def add_login(self):
         """Add Login menu"""
@@ -816,24 +1154,20 @@ class UtilsGui():
     def add_uuid(self):
         """Add Select UUID menu"""
 
-        import uuid
-        idd = ""
-#        idd = uuid.uuid4()
         self.addParameter(QgsProcessingParameterString(
             name="METADATA_UUID",
-            defaultValue=str(idd),
+            defaultValue="",  # The UUID of the metadata record is entered by the user
             description=self.tr('Enter the metadata UUID')))
 
     @staticmethod
     def add_download_info(self):
         """Add Select download info menu"""
 
-        lst_download_info_id = ["DDR_DOWNLOAD1"]
         parameter = QgsProcessingParameterEnum(
             name='DOWNLOAD_INFO_ID',
             description=self.tr("Select the download info ID"),
-            options=lst_download_info_id,
-            defaultValue=lst_download_info_id[0],
+            options=UtilsGui.LST_DOWNLOAD_INFO_ID,
+            defaultValue=UtilsGui.LST_DOWNLOAD_INFO_ID[0],
             usesStaticStrings=True,
             allowMultiple=False)
         parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
@@ -854,12 +1188,11 @@ class UtilsGui():
     def add_qgs_server_id(self):
         """Add Select server menu"""
 
-        lst_qgs_server_id = ['DDR_QGS1']
         parameter = QgsProcessingParameterEnum(
             name='QGS_SERVER_ID',
             description=self.tr('Select the QGIS server'),
-            options=lst_qgs_server_id,
-            defaultValue=lst_qgs_server_id[0],
+            options=UtilsGui.LST_QGS_SERVER_ID,
+            defaultValue=UtilsGui.LST_QGS_SERVER_ID[0],
             usesStaticStrings=True,
             allowMultiple=False)
         parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
@@ -881,12 +1214,11 @@ class UtilsGui():
     def add_keep_files(self):
         """Add Keep file menu"""
 
-        lst_flag = ['Yes', 'No']
         parameter = QgsProcessingParameterEnum(
             name='KEEP_FILES',
             description=self.tr('Keep temporary files (for debug purpose)'),
-            options=lst_flag,
-            defaultValue=lst_flag[1],
+            options=UtilsGui.LST_FLAG,
+            defaultValue=UtilsGui.LST_FLAG[1],
             usesStaticStrings=True,
             allowMultiple=False)
         parameter.setFlags(parameter.flags() | QgsProcessingParameterDefinition.FlagAdvanced)
@@ -901,6 +1233,7 @@ class UtilsGui():
         ctl_file.email = self.parameterAsString(parameters, 'EMAIL', context)
         ctl_file.qgs_server_id = self.parameterAsString(parameters, 'QGS_SERVER_ID', context)
         ctl_file.keep_files = self.parameterAsString(parameters, 'KEEP_FILES', context)
+        Utils.verbose = ctl_file.keep_files == "Yes"
         ctl_file.csz_collection_theme = self.parameterAsString(parameters, 'CSZ_THEMES', context)
         ctl_file.qgis_project_file_en = self.parameterAsString(parameters, 'QGIS_FILE_EN', context)
         ctl_file.qgis_project_file_fr = self.parameterAsString(parameters, 'QGIS_FILE_FR', context)
@@ -958,7 +1291,7 @@ class DdrPublish(QgsProcessingAlgorithm):
         
         """
 
-        help_str += help_str + UtilsGui.HELP_USAGE
+        help_str = help_str + UtilsGui.HELP_USAGE
 
         return self.tr(help_str)
 
@@ -966,9 +1299,7 @@ class DdrPublish(QgsProcessingAlgorithm):
         """Define the logo of the algorithm.
         """
 
-        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
-        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
-        return icon
+        return UtilsGui.get_icon()
 
     def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
         """Define the inputs and outputs of the algorithm.
@@ -995,20 +1326,19 @@ class DdrPublish(QgsProcessingAlgorithm):
         """"""
 
         url = 'https://qgis.ddr-stage.services.geo.ca/api/processes'
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        headers = LOGIN_TOKEN.get_headers(feedback)
+        files = {'zip_file': Utils.get_zip_file_upload(ctl_file)}
 
         Utils.push_info(feedback, f"INFO: Publishing to DDR")
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
-        Utils.push_info(feedback, f"INFO: HTTP Headers: {str(headers)}")
-        Utils.push_info(feedback, f"INFO: Zip file to publish: {ctl_file.zip_file_name}")
+        Utils.push_headers(feedback, headers)
+        Utils.push_zip_file(ctl_file, feedback)
         Utils.push_info(feedback, f"INFO: HTTP Put Request: {url}")
         try:
-            response = requests.put(url, files=files, verify=False, headers=headers)
+            response = Utils.get_http_session().put(url, files=files, headers=headers, timeout=HTTP_UPLOAD_TIMEOUT)
             ResponseCodes.publish_project_file(feedback, response)
 
-        except requests.exceptions.RequestException as e:
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
 
         return
@@ -1074,7 +1404,7 @@ class DdrValidate(QgsProcessingAlgorithm):
     plugin. This plugin does not write anything into the QGIS server so you can rerun it safely until \
     there is no error and than run the "Publish Vector Layer" Processing Plugin. """
 
-        help_str += help_str + UtilsGui.HELP_USAGE
+        help_str = help_str + UtilsGui.HELP_USAGE
 
         return self.tr(help_str)
 
@@ -1082,9 +1412,7 @@ class DdrValidate(QgsProcessingAlgorithm):
         """Define the logo of the algorithm.
         """
 
-        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
-        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
-        return icon
+        return UtilsGui.get_icon()
 
     def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
         """Define the inputs and outputs of the algorithm.
@@ -1110,23 +1438,20 @@ class DdrValidate(QgsProcessingAlgorithm):
     def validate_project_file(ctl_file, parameters, context, feedback):
         """"""
 
-#        import web_pdb; web_pdb.set_trace()
         url = 'https://qgis.ddr-stage.services.geo.ca/api/validate'
-        headers = {'accept': 'application/json',
-                   'charset': 'utf-8',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        headers = {**LOGIN_TOKEN.get_headers(feedback), 'charset': 'utf-8'}
+        files = {'zip_file': Utils.get_zip_file_upload(ctl_file)}
 
         Utils.push_info(feedback, "INFO: Validating project")
-        Utils.push_info(feedback, "INFO: HTTP Headers: ", headers)
-        Utils.push_info(feedback, "INFO: Zip file to publish: ", ctl_file.zip_file_name)
+        Utils.push_headers(feedback, headers)
+        Utils.push_zip_file(ctl_file, feedback)
 
         try:
             Utils.push_info(feedback, "INFO: HTTP Post Request: ", url)
-            response = requests.post(url, files=files, verify=False, headers=headers)
+            response = Utils.get_http_session().post(url, files=files, headers=headers, timeout=HTTP_UPLOAD_TIMEOUT)
             ResponseCodes.validate_project_file(feedback, response)
 
-        except requests.exceptions.RequestException as e:
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
         return
 
@@ -1188,7 +1513,7 @@ class DdrUnpublish(QgsProcessingAlgorithm):
         
         """
 
-        help_str += help_str + UtilsGui.HELP_USAGE
+        help_str = help_str + UtilsGui.HELP_USAGE
 
         return self.tr(help_str)
 
@@ -1196,9 +1521,7 @@ class DdrUnpublish(QgsProcessingAlgorithm):
         """Define the logo of the algorithm.
         """
 
-        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
-        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
-        return icon
+        return UtilsGui.get_icon()
 
     def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
         """Define the inputs and outputs of the algorithm.
@@ -1225,19 +1548,18 @@ class DdrUnpublish(QgsProcessingAlgorithm):
         """Unpublish a QGIS project file """
 
         url = 'https://qgis.ddr-stage.services.geo.ca/api/processes'
-        headers = {'accept': 'application/json',
-                   'Authorization': 'Bearer ' + LOGIN_TOKEN.get_token(feedback)}
-        files = {'zip_file': open(ctl_file.zip_file_name, 'rb')}
+        headers = LOGIN_TOKEN.get_headers(feedback)
+        files = {'zip_file': Utils.get_zip_file_upload(ctl_file)}
         Utils.push_info(feedback, f"INFO: Publishing to DDR")
         Utils.push_info(feedback, f"INFO: HTTP Delete Request: {url}")
-        Utils.push_info(feedback, f"INFO: HTTP Headers: {str(headers)}")
-        Utils.push_info(feedback, f"INFO: Zip file to publish: {ctl_file.zip_file_name}")
+        Utils.push_headers(feedback, headers)
+        Utils.push_zip_file(ctl_file, feedback)
 
         try:
-            response = requests.delete(url, files=files, verify=False, headers=headers)
+            response = Utils.get_http_session().delete(url, files=files, headers=headers, timeout=HTTP_UPLOAD_TIMEOUT)
             ResponseCodes.unpublish_project_file(feedback, response)
 
-        except requests.exceptions.RequestException as e:
+        except HTTP_ERROR as e:
             raise UserMessageException(f"Major problem with the DDR Publication API: {url}")
 
         return
@@ -1307,9 +1629,7 @@ class DdrLogin(QgsProcessingAlgorithm):
         """Define the logo of the algorithm.
         """
 
-        cmd_folder = os.path.split(inspect.getfile(inspect.currentframe()))[0]
-        icon = QIcon(os.path.join(os.path.join(cmd_folder, 'logo.png')))
-        return icon
+        return UtilsGui.get_icon()
 
     def initAlgorithm(self, config=None):  # pylint: disable=unused-argument
         """Define the inputs and outputs of the algorithm.
@@ -1348,6 +1668,9 @@ class DdrLogin(QgsProcessingAlgorithm):
         """Main method that extract parameters and call Simplify algorithm.
         """
 
+        # The login has no KEEP_FILES parameter; never inherit the debug mode of a previous run
+        Utils.verbose = False
+
         try:
             # Create the control file data structure
             ctl_file = ControlFile()
@@ -1356,10 +1679,7 @@ class DdrLogin(QgsProcessingAlgorithm):
             Utils.create_access_token(username, password, ctl_file, feedback)
 
             Utils.read_csz_themes(ctl_file, feedback)
-#            import web_pdb;  web_pdb.set_trace()
             Utils.read_ddr_departments(ctl_file, feedback)
-
-#            import web_pdb; web_pdb.set_trace()
             Utils.read_user_email(ctl_file, feedback)
 
         except UserMessageException as e: